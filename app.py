@@ -5,12 +5,16 @@ Runs entirely offline on localhost
 Supports nested bookmarks and ZIP downloads
 """
 
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, Response, render_template, request, send_from_directory, jsonify, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 import shutil
-from pdf_processor import PDFChapterSplitter
-from io import BytesIO
+from functools import lru_cache
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pdf_processor import PDFChapterSplitter, cleanup as release_pdf_cache
 import zipfile
 
 # Initialize Flask app
@@ -23,10 +27,34 @@ app.secret_key = 'your-secret-key-here'
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pdf'}
 
+# Read size when streaming chapter files into a ZIP download
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# Timestamp for ZIP entries (earliest date the format can store)
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Background jobs for detection and splitting, keyed by job id
+# State lives in this process, so run a single worker process (see README)
+executor = ThreadPoolExecutor(max_workers=4)
+jobs = {}
+jobs_finished = {}  # job id -> time.monotonic() when the job finished
+jobs_lock = threading.Lock()
+
+# Seconds a finished job's result stays available to /status
+JOB_RESULT_TTL = 10 * 60
+
 # Create necessary directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 
+@lru_cache(maxsize=256)
+def clean_filename(filename):
+    """
+    Cached secure_filename
+    The same names come back on every upload/split round-trip
+    """
+    return secure_filename(filename)
+
 def allowed_file(filename):
     """Check if uploaded file has valid PDF extension"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -36,11 +64,76 @@ def index():
     """Render main upload page"""
     return render_template('index.html')
 
+def prune_jobs():
+    """Forget finished jobs older than JOB_RESULT_TTL (caller holds jobs_lock)"""
+    cutoff = time.monotonic() - JOB_RESULT_TTL
+    expired = [job_id for job_id, finished in jobs_finished.items() if finished < cutoff]
+    
+    for job_id in expired:
+        del jobs_finished[job_id]
+        jobs.pop(job_id, None)
+
+def submit_job(func, *args):
+    """
+    Run func(*args) on the background executor
+    Returns a job id that can be polled at /status/<job_id>
+    """
+    job_id = uuid.uuid4().hex
+    
+    with jobs_lock:
+        prune_jobs()
+        jobs[job_id] = {'status': 'queued'}
+    
+    def run():
+        with jobs_lock:
+            jobs[job_id]['status'] = 'running'
+        try:
+            result = func(*args)
+            job = {'status': 'done', 'result': result}
+        except Exception as e:
+            job = {'status': 'error', 'error': str(e)}
+        with jobs_lock:
+            jobs[job_id] = job
+            jobs_finished[job_id] = time.monotonic()
+    
+    executor.submit(run)
+    return job_id
+
+def run_detection(filepath, filename):
+    """Background job: detect chapters in an uploaded PDF"""
+    # Initialize PDF processor
+    splitter = PDFChapterSplitter(filepath)
+    
+    # Detect chapters using bookmarks or heading analysis
+    chapters = splitter.detect_chapters()
+    
+    return {
+        'success': True,
+        'filename': filename,
+        'chapters': chapters,
+        'detection_method': splitter.detection_method
+    }
+
+def run_split(filepath, chapters, output_dir):
+    """Background job: split a PDF into chapter files"""
+    # Create output directory for this PDF
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Initialize splitter and perform split
+    splitter = PDFChapterSplitter(filepath)
+    output_files = splitter.split_chapters(chapters, output_dir)
+    
+    return {
+        'success': True,
+        'files': output_files,
+        'output_dir': output_dir
+    }
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """
-    Handle PDF upload and chapter detection
-    Returns JSON with detected chapters
+    Handle PDF upload and start chapter detection
+    Returns JSON with a job id to poll for the detected chapters
     """
     # Validate file upload
     if 'file' not in request.files:
@@ -56,23 +149,14 @@ def upload_file():
     
     try:
         # Save uploaded file securely
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filename = clean_filename(file.filename)
+        filepath = f"{app.config['UPLOAD_FOLDER']}/{filename}"
         file.save(filepath)
         
-        # Initialize PDF processor
-        splitter = PDFChapterSplitter(filepath)
+        # Detect chapters in the background
+        job_id = submit_job(run_detection, filepath, filename)
         
-        # Detect chapters using bookmarks or heading analysis
-        chapters = splitter.detect_chapters()
-        
-        # Store filepath in session for later splitting
-        return jsonify({
-            'success': True,
-            'filename': filename,
-            'chapters': chapters,
-            'detection_method': splitter.detection_method
-        })
+        return jsonify({'success': True, 'job_id': job_id}), 202
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -80,48 +164,109 @@ def upload_file():
 @app.route('/split', methods=['POST'])
 def split_pdf():
     """
-    Split PDF into chapters based on detected structure
-    Returns list of generated files
+    Start splitting a PDF into chapters based on detected structure
+    Returns JSON with a job id to poll for the generated files
     """
     try:
         data = request.get_json()
-        filename = secure_filename(data['filename'])
+        filename = clean_filename(data['filename'])
         chapters = data['chapters']
         
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        output_dir = os.path.join(app.config['OUTPUT_FOLDER'], 
-                                 filename.rsplit('.', 1)[0])
-        
-        # Create output directory for this PDF
-        os.makedirs(output_dir, exist_ok=True)
+        # Sanitized names contain no path separators, so plain string joins are safe
+        filepath = f"{app.config['UPLOAD_FOLDER']}/{filename}"
+        output_dir = f"{app.config['OUTPUT_FOLDER']}/{filename.rsplit('.', 1)[0]}"
         
-        # Initialize splitter and perform split
-        splitter = PDFChapterSplitter(filepath)
-        output_files = splitter.split_chapters(chapters, output_dir)
+        # Split in the background
+        job_id = submit_job(run_split, filepath, chapters, output_dir)
         
-        return jsonify({
-            'success': True,
-            'files': output_files,
-            'output_dir': output_dir
-        })
+        return jsonify({'success': True, 'job_id': job_id}), 202
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/status/<job_id>')
+def job_status(job_id):
+    """
+    Report the state of a background job
+    Finished jobs stay available for JOB_RESULT_TTL seconds, so a lost
+    response can be polled again
+    """
+    with jobs_lock:
+        prune_jobs()
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify(job)
+
 @app.route('/download/<path:filename>')
 def download_file(filename):
-    """Download individual chapter file"""
+    """
+    Download individual chapter file
+    Supports conditional and range requests so interrupted downloads can resume
+    """
     try:
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
-        return send_file(file_path, as_attachment=True)
+        return send_from_directory(
+            app.config['OUTPUT_FOLDER'],
+            filename,
+            as_attachment=True,
+            conditional=True
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
+class ZipStreamBuffer:
+    """
+    Write-only file object for zipfile
+    Collects written bytes until the response generator drains them
+    """
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        """Return and forget everything written since the last drain"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_zip(file_paths):
+    """
+    Build a ZIP archive of file_paths and yield it chunk by chunk
+    Only one read chunk is held in memory at a time
+    """
+    buffer = ZipStreamBuffer()
+    
+    # Chapter PDFs already carry compressed streams, so entries are stored
+    # as-is rather than run through another DEFLATE pass
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for file_path in file_paths:
+            # Add file to zip with just the filename (no directory structure)
+            # and a fixed timestamp so repeated downloads are byte-identical
+            zinfo = zipfile.ZipInfo(os.path.basename(file_path), date_time=ZIP_DATE_TIME)
+            zinfo.compress_type = zf.compression
+            
+            with open(file_path, 'rb') as src, \
+                 zf.open(zinfo, 'w', force_zip64=True) as dest:
+                while chunk := src.read(ZIP_CHUNK_SIZE):
+                    dest.write(chunk)
+                    yield buffer.drain()
+    
+    # Trailing data descriptor and central directory
+    yield buffer.drain()
+
 @app.route('/download-all/<path:dirname>')
 def download_all(dirname):
     """
     Download all chapters as a single ZIP file
-    Creates zip in memory for efficient streaming
+    Streams the zip to the client while it is being built
     """
     try:
         output_dir = os.path.join(app.config['OUTPUT_FOLDER'], dirname)
@@ -130,36 +275,24 @@ def download_all(dirname):
         if not os.path.exists(output_dir):
             return jsonify({'error': 'Output directory not found'}), 404
         
-        # Create zip file in memory
-        memory_file = BytesIO()
+        # Collect all PDF files from the output directory
+        with os.scandir(output_dir) as entries:
+            pdf_files = [
+                entry.path for entry in entries
+                if entry.name.endswith('.pdf') and entry.is_file()
+            ]
         
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            # Add all PDF files from the output directory
-            pdf_count = 0
-            for root, dirs, files in os.walk(output_dir):
-                for file in files:
-                    if file.endswith('.pdf'):
-                        file_path = os.path.join(root, file)
-                        # Add file to zip with just the filename (no directory structure)
-                        arcname = os.path.basename(file)
-                        zf.write(file_path, arcname)
-                        pdf_count += 1
-            
-            # If no PDFs found, return error
-            if pdf_count == 0:
-                return jsonify({'error': 'No PDF files found to zip'}), 404
-        
-        # Reset file pointer to beginning
-        memory_file.seek(0)
+        # If no PDFs found, return error
+        if not pdf_files:
+            return jsonify({'error': 'No PDF files found to zip'}), 404
         
         # Generate zip filename from directory name
         zip_filename = f"{dirname}_all_chapters.zip"
         
-        return send_file(
-            memory_file,
+        return Response(
+            stream_with_context(stream_zip(pdf_files)),
             mimetype='application/zip',
-            as_attachment=True,
-            download_name=zip_filename
+            headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'}
         )
     
     except Exception as e:
@@ -170,24 +303,33 @@ def download_all(dirname):
 def cleanup():
     """Clean up uploaded and output files"""
     try:
+        # Drop cached PDF documents (each is closed once no job is using it)
+        release_pdf_cache()
+        
         # Clear uploads and output directories
         for folder in [app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER']]:
-            for filename in os.listdir(folder):
-                file_path = os.path.join(folder, filename)
-                if os.path.isfile(file_path):
-                    os.unlink(file_path)
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)
+                    else:
+                        os.unlink(entry.path)
         
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-if __name__ == '__main__':
-    print("🚀 PDF Chapter Splitter running at http://localhost:5000")
+def main():
+    """
+    Local entrypoint: serve the app with Flask's threaded development server
+    Production deployments run under gunicorn instead (see README)
+    """
+    port = int(os.environ.get('PORT', 5000))
+    print(f"🚀 PDF Chapter Splitter running at http://localhost:{port}")
     print("📁 Uploads saved to:", os.path.abspath(app.config['UPLOAD_FOLDER']))
     print("📄 Output saved to:", os.path.abspath(app.config['OUTPUT_FOLDER']))
     print("💡 Features: Nested bookmarks, ZIP download, readable filenames")
-    port = int(os.environ.get('PORT', 5000))
-app.run(debug=False, host='0.0.0.0', port=port)
+    app.run(debug=False, host='0.0.0.0', port=port, threaded=True)
 
+if __name__ == '__main__':
+    main()
@@ -4,12 +4,191 @@ Supports nested bookmark structures (Parts → Chapters)
 Handles multi-level hierarchies with readable filenames
 """
 
-import pikepdf
-import fitz  # PyMuPDF
-import pdfplumber
-from collections import defaultdict
+from collections import OrderedDict
+from contextlib import contextmanager
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 import re
 import os
+import shutil
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+# Patterns that typically indicate chapter headings, merged into one
+# alternation (each branch is anchored at the start by re.match)
+_HEADING_RE = re.compile(
+    r'(?i:chapter\s+\d+)'    # "Chapter 1", "Chapter 2", etc.
+    r'|\d+\.\s+[A-Z]'        # "1. Introduction", "2. Methods"
+    r'|[A-Z][A-Z\s]{5,}$'    # ALL CAPS HEADINGS
+    r'|Part\s+[IVX\d]+'      # "Part I", "Part II"
+    r'|Section\s+\d+'        # "Section 1"
+)
+
+# Deletes characters not allowed in filenames on Windows/Mac/Linux
+_BAD_CHARS_TABLE = str.maketrans('', '', '<>:"/\\|?*')
+
+# Font analysis samples pages until either limit is reached
+_SAMPLE_MAX_PAGES = 5
+_SAMPLE_MIN_SPANS = 5000
+
+# pikepdf, PyMuPDF (fitz) and numpy are imported inside the functions that
+# use them, so code paths that never touch a PDF don't pay their import cost.
+
+# Parsed PyMuPDF documents are cached per process so that heading detection
+# on /upload and the PyMuPDF split path on /split only parse a book once.
+# Entries are keyed by absolute path and invalidated when the file's mtime changes.
+# PyMuPDF is not thread-safe: each document is borrowed by one thread at a time,
+# and an entry dropped from the cache while borrowed is closed by its last user.
+_CACHE_SIZE = 2
+_cache_lock = threading.Lock()
+_fitz_cache = OrderedDict()
+
+class _CachedDocument:
+    """A cached PyMuPDF Document plus the bookkeeping needed to share it"""
+    
+    def __init__(self, doc, mtime):
+        self.doc = doc
+        self.mtime = mtime
+        self.lock = threading.Lock()  # Held while a thread uses doc
+        self.users = 0  # Threads borrowing doc (guarded by _cache_lock)
+        self.retired = False  # Dropped from the cache, close once unused
+
+def _retire(entry):
+    """Mark a cache entry as dropped; caller must hold _cache_lock"""
+    entry.retired = True
+    if entry.users == 0:
+        entry.doc.close()
+
+@contextmanager
+def _borrow_fitz(path):
+    """
+    Borrow the cached PyMuPDF Document for path, opening it on a miss
+    The document is held exclusively until the with block exits
+    """
+    import fitz  # PyMuPDF
+    
+    key = os.path.abspath(path)
+    mtime = os.path.getmtime(key)
+    
+    with _cache_lock:
+        entry = _fitz_cache.get(key)
+        if entry is not None and entry.mtime != mtime:
+            # File was replaced since it was parsed
+            del _fitz_cache[key]
+            _retire(entry)
+            entry = None
+        
+        if entry is None:
+            entry = _CachedDocument(fitz.open(key), mtime)
+            _fitz_cache[key] = entry
+        else:
+            _fitz_cache.move_to_end(key)
+        
+        entry.users += 1
+        
+        # Evict least recently used documents
+        while len(_fitz_cache) > _CACHE_SIZE:
+            _, stale = _fitz_cache.popitem(last=False)
+            _retire(stale)
+    
+    try:
+        with entry.lock:
+            yield entry.doc
+    finally:
+        with _cache_lock:
+            entry.users -= 1
+            if entry.retired and entry.users == 0:
+                entry.doc.close()
+
+def cleanup():
+    """Drop all cached documents; ones still in use are closed by their last user"""
+    with _cache_lock:
+        for entry in _fitz_cache.values():
+            _retire(entry)
+        _fitz_cache.clear()
+
+# Upper bound on processes used to write chapter files
+_MAX_SPLIT_WORKERS = 8
+
+# Shared pool for the pikepdf chapter writer, started on first use. Workers
+# come from a forkserver (or are spawned) rather than forked from this heavily
+# threaded process, so they never inherit locks held by other threads.
+_split_pool = None
+_split_pool_lock = threading.Lock()
+
+def _get_split_pool():
+    """Return the shared pikepdf writer pool, starting it if needed"""
+    global _split_pool
+    
+    with _split_pool_lock:
+        if _split_pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            method = 'forkserver' if 'forkserver' in methods else 'spawn'
+            _split_pool = ProcessPoolExecutor(
+                max_workers=min(os.cpu_count() or 1, _MAX_SPLIT_WORKERS),
+                mp_context=multiprocessing.get_context(method)
+            )
+        return _split_pool
+
+def _discard_split_pool(pool):
+    """Drop a broken pool so the next split starts a fresh one"""
+    global _split_pool
+    
+    with _split_pool_lock:
+        if _split_pool is pool:
+            _split_pool = None
+    pool.shutdown(wait=False)
+
+# qpdf command line tool, used for page-range copies when installed
+_QPDF = shutil.which('qpdf')
+
+def _write_chapter_qpdf(src_path, start, end, output_path):
+    """
+    Copy pages start..end of src_path into output_path with the qpdf binary
+    Raises on failure so the caller can fall back to the Python writers
+    """
+    # qpdf reads a descending range as reversed pages
+    if start > end:
+        raise ValueError(f"empty page range {start + 1}-{end + 1}")
+    
+    result = subprocess.run(
+        [_QPDF, '--empty', '--no-warn', '--pages', src_path, f'{start + 1}-{end + 1}', '--', output_path],
+        capture_output=True,
+        text=True
+    )
+    
+    # Exit code 3 means the file was written with warnings
+    if result.returncode not in (0, 3):
+        raise RuntimeError(result.stderr.strip() or f"qpdf exited with code {result.returncode}")
+    
+    return output_path
+
+def _write_chapter(src_path, start, end, output_path):
+    """
+    Copy pages start..end of src_path into a new PDF at output_path
+    Runs in a worker process, so it opens its own handle on the source
+    """
+    import pikepdf
+    
+    with pikepdf.Pdf.open(src_path) as pdf, pikepdf.Pdf.new() as chapter_pdf:
+        # Copy the whole page range at once (slicing clips it to the document)
+        chapter_pdf.pages.extend(pdf.pages[start:end + 1])
+        
+        # Copy existing streams as-is instead of decoding and recompressing them
+        chapter_pdf.save(
+            output_path,
+            linearize=False,
+            object_stream_mode=pikepdf.ObjectStreamMode.preserve,
+            compress_streams=False,
+            recompress_flate=False,
+            stream_decode_level=pikepdf.StreamDecodeLevel.none
+        )
+    
+    return output_path
 
 class PDFChapterSplitter:
     """
@@ -47,122 +226,124 @@ class PDFChapterSplitter:
     def _detect_from_bookmarks(self):
         """
         Extract chapters from PDF bookmarks/outline
-        RECURSIVELY processes nested bookmarks (Parts → Chapters → Subchapters)
+        Processes nested bookmarks at every level (Parts → Chapters → Subchapters)
         Returns ALL leaf-level chapters, not just top-level items
         """
+        import pikepdf
+        
         try:
-            pdf = pikepdf.Pdf.open(self.pdf_path)
-            
-            # Check if PDF has outline/bookmarks
-            if not hasattr(pdf, 'open_outline'):
-                return []
-            
-            all_chapters = []
-            
-            with pdf.open_outline() as outline:
-                if not outline.root:
+            with pikepdf.Pdf.open(self.pdf_path) as pdf:
+                # Check if PDF has outline/bookmarks
+                if not hasattr(pdf, 'open_outline'):
                     return []
                 
-                # Recursively extract ALL nested bookmarks
-                chapter_num = 1
-                all_chapters = self._extract_nested_bookmarks(
-                    outline.root, 
-                    pdf, 
-                    chapter_num,
-                    parent_title=""
-                )
-            
-            # Calculate end pages for each chapter
-            all_chapters = self._calculate_end_pages(all_chapters, len(pdf.pages))
-            pdf.close()
-            
-            return all_chapters
+                all_chapters = []
+                total_pages = len(pdf.pages)
+                
+                with pdf.open_outline() as outline:
+                    if not outline.root:
+                        return []
+                    
+                    # Map page objects to indices once, instead of scanning
+                    # pdf.pages for every bookmark
+                    page_index = {page.obj.objgen: i for i, page in enumerate(pdf.pages)}
+                    
+                    # Extract ALL nested bookmarks
+                    all_chapters = self._extract_nested_bookmarks(outline.root, page_index)
+                
+                # Calculate end pages for each chapter
+                all_chapters = self._calculate_end_pages(all_chapters, total_pages)
+                
+                return all_chapters
         
         except Exception as e:
             print(f"Bookmark detection failed: {e}")
             return []
     
-    def _extract_nested_bookmarks(self, items, pdf, start_num=1, parent_title="", level=0):
+    def _extract_nested_bookmarks(self, items, page_index):
         """
-        RECURSIVELY extract bookmarks at ALL nesting levels
+        Extract bookmarks at ALL nesting levels
+        Walks the outline depth-first with an explicit stack instead of recursion
         
         Args:
-            items: List of outline items to process
-            pdf: pikepdf Pdf object
-            start_num: Starting chapter number
-            parent_title: Title of parent item (e.g., "Part I")
-            level: Current nesting level (0 = root)
+            items: List of top-level outline items
+            page_index: Dict mapping page object (num, gen) to page index
         
         Returns:
-            List of all leaf-level bookmarks (actual chapters)
+            List of all leaf-level bookmarks (actual chapters), in document order
         """
         chapters = []
-        chapter_num = start_num
         
-        for item in items:
+        # Each entry is (iterator over siblings, parent title, nesting level);
+        # advancing the top iterator keeps siblings in document order
+        stack = [(iter(items), "", 0)]
+        
+        while stack:
+            siblings, parent_title, level = stack[-1]
+            item = next(siblings, None)
+            
+            if item is None:
+                stack.pop()
+                continue
+            
             try:
-                # Get page number for this bookmark
-                page_num = self._get_bookmark_page(item, pdf)
                 title = str(item.title)
                 
                 # Check if this item has children (nested bookmarks)
-                has_children = hasattr(item, 'children') and len(item.children) > 0
+                children = getattr(item, 'children', None)
                 
-                if has_children:
+                if children:
                     # This is a PARENT (e.g., "Part I", "Section A")
-                    # Recursively process children
-                    print(f"{'  ' * level}📁 Parent: {title} (has {len(item.children)} children)")
+                    logger.debug("%s📁 Parent: %s (has %d children)",
+                                 '  ' * level, title, len(children))
                     
                     # Build parent context for better chapter titles
                     full_parent = f"{parent_title} → {title}" if parent_title else title
                     
-                    # RECURSIVELY extract nested chapters
-                    nested_chapters = self._extract_nested_bookmarks(
-                        item.children,
-                        pdf,
-                        chapter_num,
-                        parent_title=full_parent,
-                        level=level + 1
-                    )
-                    
-                    chapters.extend(nested_chapters)
-                    chapter_num += len(nested_chapters)
+                    # Process children before the parent's next sibling
+                    stack.append((iter(children), full_parent, level + 1))
                     
                 else:
                     # This is a LEAF chapter (actual content chapter)
+                    page_num = self._get_bookmark_page(item, page_index)
+                    
                     if page_num is not None:
                         # Build full chapter title with parent context
                         full_title = f"{parent_title} → {title}" if parent_title else title
                         
-                        print(f"{'  ' * level}📄 Chapter {chapter_num}: {full_title} (page {page_num})")
+                        logger.debug("%s📄 Chapter: %s (page %s)",
+                                     '  ' * level, full_title, page_num)
                         
                         chapters.append({
                             'title': title,  # Original title only
                             'full_title': full_title,  # Full path with parents
                             'parent': parent_title,
                             'start_page': page_num,
-                            'chapter_num': chapter_num,
                             'level': level
                         })
-                        chapter_num += 1
             
             except Exception as e:
                 print(f"Warning: Could not process bookmark: {e}")
                 continue
         
+        # Number chapters in document order
+        for chapter_num, chapter in enumerate(chapters, start=1):
+            chapter['chapter_num'] = chapter_num
+        
         return chapters
     
-    def _get_bookmark_page(self, outline_item, pdf):
+    def _get_bookmark_page(self, outline_item, page_index):
         """
         Extract page number from bookmark outline item
         Handles direct and indirect destinations
+        Pages are resolved through page_index in O(1)
         """
         try:
             if hasattr(outline_item, 'destination'):
                 dest = outline_item.destination
                 if dest and len(dest) > 0:
                     page_obj = dest[0]
-                    return pikepdf.Page(page_obj).index
+                    return page_index.get(page_obj.objgen)
             
             # Try action dictionary as fallback
             if hasattr(outline_item, 'action'):
@@ -171,7 +352,7 @@ class PDFChapterSplitter:
                     dest = action['/D']
                     if dest and len(dest) > 0:
                         page_obj = dest[0]
-                        return pikepdf.Page(page_obj).index
+                        return page_index.get(page_obj.objgen)
         
         except Exception as e:
             print(f"Could not extract page from bookmark: {e}")
@@ -184,109 +365,134 @@ class PDFChapterSplitter:
         Uses font size, text patterns, and layout structure
         """
         try:
-            doc = fitz.open(self.pdf_path)
-            
-            # Analyze font sizes across document
-            font_sizes = self._analyze_font_sizes(doc)
-            
-            # Get threshold for heading font size (top 10% largest)
-            heading_threshold = self._calculate_heading_threshold(font_sizes)
-            
-            chapters = []
-            chapter_num = 1
-            
-            # Scan pages for potential chapter headings
-            for page_num in range(len(doc)):
-                page = doc[page_num]
+            with _borrow_fitz(self.pdf_path) as doc:
+                # Analyze font sizes across document (keeps the sampled pages' spans)
+                font_sizes, sampled_spans = self._analyze_font_sizes(doc)
                 
-                # Extract text with font information
-                blocks = page.get_text("dict")["blocks"]
+                # Get threshold for heading font size (top 10% largest)
+                heading_threshold = self._calculate_heading_threshold(font_sizes)
                 
-                for block in blocks:
-                    if "lines" not in block:
-                        continue
+                chapters = []
+                chapter_num = 1
+                total_pages = len(doc)
+                sampled_pages = len(sampled_spans)
+                
+                # Scan pages for potential chapter headings
+                for page_num in range(total_pages):
+                    # Reuse spans already extracted during font analysis
+                    if page_num < sampled_pages:
+                        spans = sampled_spans[page_num]
+                    else:
+                        spans = self._page_spans(doc[page_num])
                     
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            text = span["text"].strip()
-                            font_size = span["size"]
+                    for font_size, text in spans:
+                        text = text.strip()
+                        
+                        # Check if this looks like a chapter heading
+                        if (font_size >= heading_threshold and 
+                            self._is_chapter_heading(text)):
                             
-                            # Check if this looks like a chapter heading
-                            if (font_size >= heading_threshold and 
-                                self._is_chapter_heading(text)):
-                                
-                                chapters.append({
-                                    'title': text,
-                                    'full_title': text,
-                                    'parent': '',
-                                    'start_page': page_num,
-                                    'chapter_num': chapter_num,
-                                    'font_size': font_size,
-                                    'level': 0
-                                })
-                                chapter_num += 1
-            
-            # Calculate end pages
-            chapters = self._calculate_end_pages(chapters, len(doc))
-            doc.close()
-            
-            return chapters
+                            chapters.append({
+                                'title': text,
+                                'full_title': text,
+                                'parent': '',
+                                'start_page': page_num,
+                                'chapter_num': chapter_num,
+                                'font_size': font_size,
+                                'level': 0
+                            })
+                            chapter_num += 1
+                
+                # Calculate end pages
+                chapters = self._calculate_end_pages(chapters, total_pages)
+                
+                return chapters
         
         except Exception as e:
             print(f"Heading detection failed: {e}")
             return self._create_default_chapters()
     
+    def _page_spans(self, page):
+        """
+        Extract (font size, text) pairs for every text span on a page
+        Image blocks are skipped so no image data is decoded
+        """
+        import fitz  # PyMuPDF
+        
+        # Text-only extraction flags (no image blocks)
+        flags = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+        blocks = page.get_text("dict", flags=flags)["blocks"]
+        
+        return [
+            (span["size"], span["text"])
+            for block in blocks if "lines" in block
+            for line in block["lines"]
+            for span in line["spans"]
+        ]
+    
     def _analyze_font_sizes(self, doc):
-        """Extract all font sizes from document for analysis"""
-        font_sizes = []
+        """
+        Extract font sizes from the first pages for analysis
+        
+        Returns:
+            Tuple of (array of span font sizes, list of span lists per sampled page)
+        """
+        import numpy as np
         
-        for page_num in range(min(20, len(doc))):  # Sample first 20 pages
-            page = doc[page_num]
-            blocks = page.get_text("dict")["blocks"]
+        # Sample the first pages until there are enough spans for a stable percentile
+        sampled_spans = []
+        span_count = 0
+        
+        for page_num in range(min(_SAMPLE_MAX_PAGES, len(doc))):
+            spans = self._page_spans(doc[page_num])
+            sampled_spans.append(spans)
+            span_count += len(spans)
             
-            for block in blocks:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            font_sizes.append(span["size"])
+            if span_count >= _SAMPLE_MIN_SPANS:
+                break
+        
+        font_sizes = np.fromiter(
+            (size for spans in sampled_spans for size, _ in spans),
+            dtype=np.float64,
+            count=span_count
+        )
         
-        return font_sizes
+        return font_sizes, sampled_spans
     
     def _calculate_heading_threshold(self, font_sizes):
         """Calculate font size threshold for headings (90th percentile)"""
-        if not font_sizes:
+        import numpy as np
+        
+        if not font_sizes.size:
             return 14.0
         
-        sorted_sizes = sorted(font_sizes, reverse=True)
-        percentile_90_idx = int(len(sorted_sizes) * 0.1)
+        # Size at position int(n * 0.1) from the top (as the old descending
+        # sort picked it), selected in O(n)
+        kth = len(font_sizes) - 1 - int(len(font_sizes) * 0.1)
         
-        return sorted_sizes[percentile_90_idx] if percentile_90_idx < len(sorted_sizes) else 14.0
+        return float(np.partition(font_sizes, kth)[kth])
     
     def _is_chapter_heading(self, text):
         """
         Check if text matches chapter heading patterns
         Looks for common chapter indicators
         """
-        # Patterns that typically indicate chapter headings
-        patterns = [
-            r'^chapter\s+\d+',  # "Chapter 1", "Chapter 2", etc.
-            r'^\d+\.\s+[A-Z]',  # "1. Introduction", "2. Methods"
-            r'^[A-Z][A-Z\s]{5,}$',  # ALL CAPS HEADINGS
-            r'^Part\s+[IVX\d]+',  # "Part I", "Part II"
-            r'^Section\s+\d+',  # "Section 1"
-        ]
+        # Cheap length and first-character checks rule out most spans
+        # (paragraphs, page numbers, lowercase text) before any regex work
+        n = len(text)
+        if n < 4 or n > 120:
+            return False
         
-        text_lower = text.lower()
+        c0 = text[0]
+        if not (c0.isupper() or c0.isdigit()):
+            return False
         
-        # Check patterns
-        for pattern in patterns:
-            if re.search(pattern, text_lower):
-                return True
+        # Heuristic: short text starting with a capital (the common case)
+        if n < 100 and c0.isupper():
+            return True
         
-        # Additional heuristics: short text, starts with capital
-        if (len(text) < 100 and 
-            len(text) > 3 and 
-            text[0].isupper()):
+        # Patterns only need to decide digit-led and 100-120 character spans
+        if _HEADING_RE.match(text):
             return True
         
         return False
@@ -303,9 +509,10 @@ class PDFChapterSplitter:
     
     def _create_default_chapters(self):
         """Create default chapter structure if detection fails"""
-        pdf = pikepdf.Pdf.open(self.pdf_path)
-        total_pages = len(pdf.pages)
-        pdf.close()
+        import pikepdf
+        
+        with pikepdf.Pdf.open(self.pdf_path) as pdf:
+            total_pages = len(pdf.pages)
         
         # Split into equal chunks of ~20 pages
         chapters = []
@@ -339,30 +546,22 @@ class PDFChapterSplitter:
             List of output file paths
         """
         output_files = []
+        jobs = []
         
         try:
-            pdf = pikepdf.Pdf.open(self.pdf_path)
-            
             for chapter in chapters:
-                # Create new PDF for this chapter
-                chapter_pdf = pikepdf.Pdf.new()
-                
-                # Extract pages for this chapter
+                # Pages for this chapter
                 start = chapter['start_page']
                 end = chapter['end_page']
                 
-                for page_num in range(start, end + 1):
-                    if page_num < len(pdf.pages):
-                        chapter_pdf.pages.append(pdf.pages[page_num])
-                
                 # Generate READABLE filename using ACTUAL chapter title
                 display_title = chapter.get('full_title', chapter['title'])
                 chapter_title = chapter['title']
                 
                 # Clean title for filename (remove special characters)
                 # Remove invalid filename characters for Windows/Mac/Linux
-                safe_title = re.sub(r'[<>:"/\\|?*]', '', chapter_title)  # Remove invalid chars
-                safe_title = re.sub(r'\s+', ' ', safe_title).strip()  # Clean whitespace
+                safe_title = chapter_title.translate(_BAD_CHARS_TABLE)  # Remove invalid chars
+                safe_title = ' '.join(safe_title.split())  # Clean whitespace
                 safe_title = safe_title[:80]  # Limit length to 80 characters
                 
                 # Remove leading/trailing dots and spaces (Windows issue)
@@ -376,8 +575,7 @@ class PDFChapterSplitter:
                 filename = f"{chapter['chapter_num']:02d} - {safe_title}.pdf"
                 output_path = os.path.join(output_dir, filename)
                 
-                # Save chapter PDF
-                chapter_pdf.save(output_path)
+                jobs.append((self.pdf_path, start, end, output_path))
                 
                 output_files.append({
                     'filename': filename,
@@ -388,9 +586,63 @@ class PDFChapterSplitter:
                     'path': os.path.relpath(output_path, 'output')
                 })
             
-            pdf.close()
+            # Copy page ranges with the qpdf binary when it is installed; the
+            # subprocesses run concurrently while threads wait on them
+            remaining_jobs = jobs
+            if _QPDF and jobs:
+                remaining_jobs = []
+                max_workers = min(os.cpu_count() or 1, _MAX_SPLIT_WORKERS, len(jobs))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {executor.submit(_write_chapter_qpdf, *job): job for job in jobs}
+                    for future in as_completed(futures):
+                        try:
+                            future.result()
+                        except Exception as e:
+                            job = futures[future]
+                            print(f"qpdf could not write {job[3]}, using PyMuPDF: {e}")
+                            remaining_jobs.append(job)
+            
+            # Copy remaining page ranges with PyMuPDF from the cached document
+            fallback_jobs = []
+            for job in remaining_jobs:
+                try:
+                    self._write_chapter_fitz(*job[1:])
+                except Exception as e:
+                    print(f"PyMuPDF could not write {job[3]}, using pikepdf: {e}")
+                    fallback_jobs.append(job)
+            
+            # Write remaining chapters with pikepdf in parallel, one process per file
+            if fallback_jobs:
+                pool = _get_split_pool()
+                try:
+                    futures = [pool.submit(_write_chapter, *job) for job in fallback_jobs]
+                    for future in as_completed(futures):
+                        future.result()  # Re-raise any worker error
+                except BrokenProcessPool:
+                    _discard_split_pool(pool)
+                    raise
             
         except Exception as e:
             raise Exception(f"Failed to split PDF: {str(e)}")
         
         return output_files
+    
+    def _write_chapter_fitz(self, start, end, output_path):
+        """
+        Copy pages start..end into a new PDF using PyMuPDF
+        Raises if the range is empty so the caller can fall back to pikepdf
+        """
+        import fitz  # PyMuPDF
+        
+        with _borrow_fitz(self.pdf_path) as src:
+            end = min(end, len(src) - 1)
+            
+            if start > end:
+                raise ValueError(f"empty page range {start + 1}-{end + 1}")
+            
+            out = fitz.open()
+            try:
+                out.insert_pdf(src, from_page=start, to_page=end)
+                out.save(output_path, garbage=0, deflate=True, clean=False)
+            finally:
+                out.close()